@@ -1,31 +1,69 @@
+import av
 import cv2
 import base64
 import os
-import json
-from typing import TypedDict, Any
-from langgraph.graph import StateGraph, END
+import orjson
+import asyncio
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.types import RetryPolicy
+from langchain_core.runnables import RunnableConfig
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+import aiohttp
+import requests
+
+# Optional fast paths for frame encoding (fall back to cv2 + stdlib base64)
+try:
+    import pybase64 as b64
+except ImportError:
+    b64 = base64
+
+try:
+    from av.codec.hwaccel import HWAccel
+except ImportError:  # PyAV < 14
+    HWAccel = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _tj = TurboJPEG()
+except (ImportError, RuntimeError, OSError):
+    _tj = None
 
 # Environment Setup
 os.environ["NVIDIA_API_KEY"] = "ADD API"
 
+MAX_IMAGE_EDGE = 896  # VLM tiles internally; larger frames only cost bandwidth
+
 def encode_image(image):
-    """Compress and encode frame to base64."""
-    _, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
-    return base64.b64encode(buffer).decode("utf-8")
+    """Downscale, compress and encode frame to base64."""
+    h, w = image.shape[:2]
+    scale = MAX_IMAGE_EDGE / max(h, w)
+    if scale < 1.0:
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+    if _tj is not None:
+        buffer = _tj.encode(image, quality=50, pixel_format=TJPF_BGR)
+    else:
+        _, buffer = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), 50])
+    return b64.b64encode(buffer).decode("ascii")
 
 # State and Schema Definitions
-class AgentState(TypedDict):
+@dataclass(slots=True)
+class AgentState:
     frame_b64: str          
     frame_b642: str
     initial_trigger: str    
-    incident_report: str    
+    incident_report: dict
     critique_score: str     
     final_decision: str
-    log_callback: Any
     timestamp: str  # Added for better tracking
 
 class AccidentReport(BaseModel):
@@ -38,80 +76,124 @@ class AccidentReport(BaseModel):
 
 VISION_MODEL = "nvidia/nemotron-nano-12b-v2-vl"
 
+# Shared clients, built once and reused by every agent invocation
+_LLM = ChatNVIDIA(model=VISION_MODEL)
+
+@lru_cache(maxsize=None)
+def structured_llm():
+    """
+    Reporter client, built on first use. Binding the schema queries the
+    model list, which would otherwise make importing this module need the API.
+    """
+    return _LLM.with_structured_output(AccidentReport)
+
+# Watcher and critic only answer with a single verdict word. Reasoning is
+# switched off so the capped output isn't spent on a thinking preamble.
+_VERDICT_LLM = ChatNVIDIA(model=VISION_MODEL, max_completion_tokens=4, temperature=0)
+_NO_THINK = SystemMessage(content="/no_think")
+
+# Prompts
+TRIGGER_PROMPT = """
+Look for a SEVERE CAR ACCIDENT.
+Reply strictly: YES or NO
+"""
+
+REPORTER_PROMPT = """
+You are a 911 Emergency Dispatch AI. Analyze this image of a traffic accident.
+CRITICAL PROTOCOL: Assume potential injuries in ANY vehicle damage.
+You MUST recommend dispatching emergency units for any crash.
+Never say "No action required."
+"""
+
+CRITIC_PROMPT = """
+You are a Safety Supervisor. Goal: PREVENT MISSED ACCIDENTS.
+An investigator flagged a possible crash; this frame was captured 0.5s later.
+
+DECISION RULES:
+1. If you see ANY vehicle damage, debris, or cars stopped at odd angles -> APPROVED.
+2. If the scene is ambiguous -> APPROVED (Safety first).
+3. Only REJECT if it is 100% normal flowing traffic.
+
+Answer strictly: APPROVED or REJECTED
+"""
+
+# Text parts are shared across calls; only the image URL changes per frame
+_TRIGGER_TEXT_PART = {"type": "text", "text": TRIGGER_PROMPT}
+_REPORTER_TEXT_PART = {"type": "text", "text": REPORTER_PROMPT}
+_CRITIC_TEXT_PART = {"type": "text", "text": CRITIC_PROMPT}
+_DATA_URL_PREFIX = "data:image/jpeg;base64,"
+
+def vision_message(text_part, b64_img):
+    """Build a prompt + image message for the vision model."""
+    return HumanMessage(content=[
+        text_part,
+        {"type": "image_url", "image_url": {"url": _DATA_URL_PREFIX + b64_img}}
+    ])
+
 # Agent Nodes
-def reporter_agent(state: AgentState):
-    log = state.get("log_callback", print)
-    log("\n[NODE: Investigator] 🔍 Analyzing crash dynamics...")
-    
-    llm = ChatNVIDIA(model=VISION_MODEL)
-    structured_llm = llm.with_structured_output(AccidentReport)
-    
-    prompt = """
-    You are a 911 Emergency Dispatch AI. Analyze this image of a traffic accident.
-    CRITICAL PROTOCOL: Assume potential injuries in ANY vehicle damage.
-    You MUST recommend dispatching emergency units for any crash.
-    Never say "No action required."
+_HTTP_STATUS = re.compile(r"\[(\d{3})\]")
+
+def is_transient_error(exc):
     """
+    Whether an API error is worth retrying: connection failures, timeouts and
+    5xx responses. The NVIDIA client raises bare Exceptions for HTTP errors,
+    with the status as a "[503] ..." prefix.
+    """
+    if isinstance(exc, (ConnectionError, TimeoutError, requests.ConnectionError,
+                        requests.Timeout, aiohttp.ClientConnectionError)):
+        return True
+    match = _HTTP_STATUS.match(str(exc))
+    return match is not None and match.group(1).startswith("5")
+
+def get_logger(config: RunnableConfig):
+    """Log callback for this run. Kept out of the state so it can be checkpointed."""
+    return config.get("configurable", {}).get("log_callback", print)
+
+async def reporter_agent(state: AgentState, config: RunnableConfig):
+    log = get_logger(config)
+    log("\n[NODE: Investigator] 🔍 Analyzing crash dynamics...")
     
-    msg = HumanMessage(content=[
-        {"type": "text", "text": prompt},
-        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{state['frame_b64']}"}}
-    ])
+    msg = vision_message(_REPORTER_TEXT_PART, state.frame_b64)
     
+    # Transient API errors propagate so the node is retried and, failing
+    # that, stays pending in the checkpoint. Anything else, or the last
+    # incident attempt, falls back to a placeholder so dispatch still runs.
     try:
-        response = structured_llm.invoke([msg])
-        report = response.model_dump()
-        
-        # Log structured report for frontend
-        log(f"[Investigator] Accident Type: {report['what_type']}")
-        log(f"[Investigator] Severity: {report['severity']}")
-        log(f"[Investigator] Hazards: {report['hazards']}")
-        
-        return {"incident_report": response.model_dump_json()}
+        response = await structured_llm().ainvoke([msg])
     except Exception as e:
+        if is_transient_error(e) and not config.get("configurable", {}).get("fallback_report"):
+            raise
         log(f"[ERROR] Reporter Agent failed: {e}")
-        return {"incident_report": json.dumps({"is_accident": False, "what_type": "Unknown", "severity": "Unknown", "hazards": "Analysis Failed", "description": str(e), "location_bbox": [0,0,0,0]})}
-
-def critic_agent(state: AgentState):
-    log = state.get("log_callback", print)
-    log(f"[NODE: Critic] ⚖️ Validating evidence...")
+        return {"incident_report": {"is_accident": False, "what_type": "Unknown", "severity": "Unknown", "hazards": "Analysis Failed", "description": str(e), "location_bbox": [0,0,0,0]}}
+    report = response.model_dump()
     
-    llm = ChatNVIDIA(model=VISION_MODEL)
+    # Log structured report for frontend
+    log(f"[Investigator] Accident Type: {report['what_type']}")
+    log(f"[Investigator] Severity: {report['severity']}")
+    log(f"[Investigator] Hazards: {report['hazards']}")
     
-    prompt = f"""
-    You are a Safety Supervisor. Goal: PREVENT MISSED ACCIDENTS.
-    REPORT TO VALIDATE: "{state['incident_report']}"
+    return {"incident_report": report}
+
+async def critic_agent(state: AgentState, config: RunnableConfig):
+    log = get_logger(config)
+    log(f"[NODE: Critic] ⚖️ Validating evidence...")
     
-    DECISION RULES:
-    1. If you see ANY vehicle damage, debris, or cars stopped at odd angles -> APPROVED.
-    2. If the scene is ambiguous -> APPROVED (Safety first).
-    3. Only REJECT if it is 100% normal flowing traffic.
+    msg = vision_message(_CRITIC_TEXT_PART, state.frame_b642)
     
-    Answer strictly: APPROVED or REJECTED
-    """
+    response = await _VERDICT_LLM.ainvoke([_NO_THINK, msg])
+    score = response.content.strip().upper()
     
-    msg = HumanMessage(content=[
-        {"type": "text", "text": prompt},
-        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{state['frame_b642']}"}}
-    ])
-    
-    try:
-        response = llm.invoke([msg])
-        score = response.content.strip().upper()
-        
-        final_score = "APPROVED" if "APPROVED" in score else "REJECTED"
-        log(f"[NODE: Critic] Verdict: {final_score}")
-        return {"critique_score": final_score}
-    except Exception as e:
-        log(f"[ERROR] Critic Agent failed: {e}")
-        return {"critique_score": "REJECTED"}
+    # Only an explicit rejection discards the incident; truncated or
+    # unrecognised answers count as ambiguous, which the rules approve
+    final_score = "REJECTED" if "REJECT" in score else "APPROVED"
+    log(f"[NODE: Critic] Verdict: {final_score}")
+    return {"critique_score": final_score}
 
-def dispatcher_agent(state: AgentState):
-    log = state.get("log_callback", print)
+def dispatcher_agent(state: AgentState, config: RunnableConfig):
+    log = get_logger(config)
     
     try:
-        # Parse the incident report
-        report = json.loads(state['incident_report'])
+        report = state.incident_report
         
         # Create formatted emergency dispatch
         dispatch_info = {
@@ -119,7 +201,7 @@ def dispatcher_agent(state: AgentState):
             "ActionRequired": True,
             "ConfidenceScore": "High" if report['is_accident'] else "Medium",
             "Reason": report['description'],
-            "Location": f"Camera Feed - Timestamp: {state.get('timestamp', 'Unknown')}",
+            "Location": f"Camera Feed - Timestamp: {state.timestamp}",
             "Hazards": report['hazards'],
             "Units": [
                 {"Type": "Fire & Rescue", "Count": 2 if report['severity'] == "High" else 1},
@@ -129,7 +211,7 @@ def dispatcher_agent(state: AgentState):
         }
         
         # Log formatted JSON for the frontend to parse and display nicely
-        log(json.dumps(dispatch_info, indent=2))
+        log(orjson.dumps(dispatch_info, option=orjson.OPT_INDENT_2).decode())
         
         log("\n" + "█"*60)
         log("🚨  EMERGENCY RESPONSE DISPATCHED  🚨")
@@ -146,116 +228,335 @@ def dispatcher_agent(state: AgentState):
 
 # Graph Construction
 workflow = StateGraph(AgentState)
-workflow.add_node("reporter", reporter_agent)
-workflow.add_node("critic", critic_agent)
+# Vision calls retry transient API failures before the run is abandoned
+VISION_RETRY = RetryPolicy(max_attempts=3, retry_on=is_transient_error)
+workflow.add_node("reporter", reporter_agent, retry_policy=VISION_RETRY)
+workflow.add_node("critic", critic_agent, retry_policy=VISION_RETRY)
+workflow.add_node("review", lambda state: {})
 workflow.add_node("dispatcher", dispatcher_agent)
 
-workflow.set_entry_point("reporter")
-workflow.add_edge("reporter", "critic")
+# Reporter and critic look at independent frames, so run them concurrently
+# and join before routing.
+workflow.add_edge(START, "reporter")
+workflow.add_edge(START, "critic")
+workflow.add_edge(["reporter", "critic"], "review")
 
-def router(state: AgentState):
-    log = state.get("log_callback", print)
-    if state["critique_score"] == "APPROVED":
+def router(state: AgentState, config: RunnableConfig):
+    log = get_logger(config)
+    if state.critique_score == "APPROVED":
         return "dispatcher"
     log("[System] False alarm discarded. Continuing surveillance...")
     return END
 
-workflow.add_conditional_edges("critic", router, {"dispatcher": "dispatcher", END: END})
+workflow.add_conditional_edges("review", router, {"dispatcher": "dispatcher", END: END})
 workflow.add_edge("dispatcher", END)
-sentinel_app = workflow.compile()
+
+# Node outputs are checkpointed in memory per incident so a failed attempt
+# can resume without repeating the vision calls that already succeeded.
+INCIDENT_ATTEMPTS = 2
+
+async def run_sentinel(sentinel_app, inputs: AgentState, thread_id: str, log_callback=print, fallback_report=False):
+    """
+    Run the compiled incident graph, resuming an unfinished run of the same thread.
+    With fallback_report the reporter records a placeholder report instead
+    of failing, so the critic and dispatcher still get to run.
+    """
+    config = {"configurable": {
+        "thread_id": thread_id,
+        "log_callback": log_callback,
+        "fallback_report": fallback_report,
+    }}
+    snapshot = await sentinel_app.aget_state(config)
+    if snapshot.next:
+        log_callback(f"[System] Resuming interrupted run at: {', '.join(snapshot.next)}")
+        return await sentinel_app.ainvoke(None, config)
+    return await sentinel_app.ainvoke(inputs, config)
 
 # Main Surveillance Logic
-def main_watcher(video_path, log_callback=print):
+STREAM_PREFIXES = ("rtsp://", "http://", "https://", "udp://")
+STREAM_CAPTURE_OPTIONS = {"rtsp_transport": "udp", "fflags": "nobuffer", "flags": "low_delay"}
+
+def is_stream_source(video_path):
+    """Whether the path is a live stream URL rather than a video file."""
+    return video_path.startswith(STREAM_PREFIXES)
+
+# Samples whose motion score against the last checked sample is below
+# MOTION_THRESHOLD skip the watcher call, but never more than
+# MAX_SKIPPED_SAMPLES in a row
+MOTION_SIZE = (128, 128)
+MOTION_GRID = (16, 16)
+MOTION_THRESHOLD = 20.0
+MAX_SKIPPED_SAMPLES = 4
+
+def motion_score(gray, ref_gray):
+    """
+    Largest mean grey-level change over a MOTION_GRID of blocks, so a
+    car-sized change isn't averaged away by the rest of the frame.
+    """
+    diff = cv2.absdiff(gray, ref_gray)
+    return float(cv2.resize(diff, MOTION_GRID, interpolation=cv2.INTER_AREA).max())
+
+class VideoSource:
+    """
+    PyAV decoder for a video file or stream. Decoding uses NVDEC when
+    available; only the frames that are actually read are converted to BGR.
+    """
+
+    def __init__(self, video_path, is_stream=False):
+        # Ask FFmpeg not to buffer live input so samples reflect the present
+        options = dict(STREAM_CAPTURE_OPTIONS) if is_stream else {}
+        self.container = None
+        if HWAccel is not None:
+            try:
+                hwaccel = HWAccel(device_type="cuda", allow_software_fallback=True)
+                self.container = av.open(video_path, options=options, hwaccel=hwaccel)
+            except av.error.FFmpegError:
+                pass  # No usable CUDA device; decode in software
+        if self.container is None:
+            self.container = av.open(video_path, options=options)
+        self.stream = self.container.streams.video[0]
+        # Frame threading queues several frames in the decoder, which would
+        # undo nobuffer/low_delay on live input
+        self.stream.thread_type = "SLICE" if is_stream else "AUTO"
+        self.fps = float(self.stream.average_rate or 0)
+        self.total_frames = self.stream.frames or int((self.container.duration or 0) / av.time_base * self.fps)
+        self.position = -1  # Index of the last decoded frame
+        self._frames = self.container.decode(self.stream)
+
+    def read(self, index):
+        """Decode forward to frame `index` (or the next one, if already past it)."""
+        try:
+            for frame in self._frames:
+                self.position += 1
+                if self.position >= index:
+                    return frame.to_ndarray(format="bgr24")
+        except av.error.FFmpegError:
+            pass
+        return None
+
+    def seek(self, index):
+        """Seek to frame `index` (files only); later reads continue from there."""
+        start = self.stream.start_time or 0
+        rewind = 0.0  # Seconds to back off if the seek lands past the target
+        while True:
+            offset = max(index / self.fps - rewind, 0.0)
+            self.container.seek(start + int(offset / self.stream.time_base), stream=self.stream)
+            self._frames = self.container.decode(self.stream)
+            first = True
+            try:
+                for frame in self._frames:
+                    if frame.pts is None:
+                        continue
+                    self.position = round((frame.pts - start) * self.stream.time_base * self.fps)
+                    # FFmpeg seeks by dts, so it can land on a keyframe whose
+                    # pts is already past the target; retry from further back
+                    if first and self.position > index and offset > 0:
+                        break
+                    first = False
+                    if self.position >= index:
+                        return frame.to_ndarray(format="bgr24")
+                else:
+                    return None
+            except av.error.FFmpegError:
+                return None
+            rewind += 1.0
+
+    def close(self):
+        self.container.close()
+
+def main_watcher(video_path, log_callback=print, pipeline=True, batch_size=1, stop_event=None):
     """
     Main video surveillance function with real-time logging.
+
+    With pipeline=True the next sample is decoded and sent to the watcher
+    while the current one is still awaiting its response. Set it to False
+    to only ever have one watcher call in flight.
+
+    batch_size samples are sent to the watcher per round-trip; raising it
+    amortizes latency when scanning whole videos, at the cost of reporting
+    a hit only once its batch returns.
+
+    Setting stop_event (a threading.Event) ends surveillance after the
+    current sample, e.g. when the client has gone away.
     """
-    if not os.path.exists(video_path):
+    is_stream = is_stream_source(video_path)
+    if not is_stream and not os.path.exists(video_path):
         log_callback(f"❌ Video not found at {video_path}.")
         return
 
-    watcher_llm = ChatNVIDIA(model=VISION_MODEL)
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    watcher_llm = _VERDICT_LLM
+    # Checkpoints only serve retries within this session, so they live in
+    # memory and each incident's frames are dropped once it is handled
+    memory = InMemorySaver()
+    sentinel_app = workflow.compile(checkpointer=memory)
+    try:
+        video = VideoSource(video_path, is_stream)
+    except (av.error.FFmpegError, IndexError) as e:
+        log_callback(f"❌ Error opening video stream: {e}")
+        return
+    fps = video.fps
     
     if fps == 0 or fps is None:
         log_callback("❌ Error reading video stream. Invalid FPS.")
+        video.close()
         return
 
-    step_frames = int(fps * 2.0)  # Sample every 2 seconds
+    step_seconds = 2.0  # Sample every 2 seconds
+    step_frames = int(fps * step_seconds)
     curr_frame = 0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    total_frames = video.total_frames
+    inv_fps = 1.0 / fps
+    inv_total = 100.0 / total_frames if total_frames else 0.0
     
     log_callback("━"*60)
     log_callback("🚔 NEMOTRON SENTINEL ACTIVE")
     log_callback(f"📹 Video: {os.path.basename(video_path)}")
-    log_callback(f"⏱️  Duration: {int(total_frames/fps)} seconds | FPS: {fps:.1f}")
+    if is_stream:
+        log_callback(f"📡 Live stream | FPS: {fps:.1f}")
+    else:
+        log_callback(f"⏱️  Duration: {int(total_frames/fps)} seconds | FPS: {fps:.1f}")
     log_callback(f"🔍 Scanning every 2 seconds")
     log_callback("━"*60 + "\n")
 
-    while cap.isOpened():
-        cap.set(cv2.CAP_PROP_POS_FRAMES, curr_frame)
-        ret, frame = cap.read()
-        if not ret: 
-            break
+    def check_frames(frames):
+        """Encode frames and ask the watcher whether each shows a crash."""
+        images = [encode_image(frame) for frame in frames]
+        msgs = [[_NO_THINK, vision_message(_TRIGGER_TEXT_PART, b64_img)] for b64_img in images]
+        responses = watcher_llm.batch(msgs, config={"max_concurrency": len(msgs)}, return_exceptions=True)
+        return [
+            (b64_img, res if isinstance(res, Exception) else res.content.strip().upper())
+            for b64_img, res in zip(images, responses)
+        ]
 
-        timestamp = f"{int(curr_frame/fps//60):02}:{int(curr_frame/fps%60):02}"
-        progress = int((curr_frame / total_frames) * 100)
-        log_callback(f"⏰ [{timestamp}] Progress: {progress}% - Analyzing frame...")
-        
-        b64_img = encode_image(frame)
-        
-        trigger_prompt = """
-        Look for a SEVERE CAR ACCIDENT.
-        Reply strictly: "DETECTED: YES" or "DETECTED: NO"
+    def sample_results():
         """
-        
-        msg = HumanMessage(content=[
-            {"type": "text", "text": trigger_prompt},
-            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64_img}"}}
-        ])
-        
-        try:
-            trigger_res = watcher_llm.invoke([msg]).content.strip().upper()
+        Yield (frame_index, frame, b64_img, verdict) for each sample in order,
+        keeping up to `depth` batches in flight. verdict is the exception
+        if that frame's watcher call failed, or None if the frame was
+        skipped for lack of motion.
+        """
+        nonlocal curr_frame
+        in_flight = deque()  # (samples, future) in submission order
+        exhausted = False
+        ref_gray = None  # Last sample sent to the watcher
+        skipped = 0
+        while True:
+            while len(in_flight) < depth and not exhausted:
+                samples = []
+                while len(samples) < batch_size:
+                    if not is_stream and curr_frame >= total_frames:
+                        exhausted = True
+                        break
+                    frame = video.read(curr_frame)
+                    if frame is None:
+                        exhausted = True
+                        break
+                    # Only pay for a watcher call if the scene changed since the last checked sample
+                    gray = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), MOTION_SIZE, interpolation=cv2.INTER_AREA)
+                    moving = (
+                        ref_gray is None
+                        or skipped >= MAX_SKIPPED_SAMPLES
+                        or motion_score(gray, ref_gray) >= MOTION_THRESHOLD
+                    )
+                    if moving:
+                        ref_gray = gray
+                        skipped = 0
+                    else:
+                        skipped += 1
+                    samples.append((curr_frame, frame, moving))
+                    curr_frame += step_frames
+                if samples:
+                    frames = [frame for _, frame, moving in samples if moving]
+                    future = executor.submit(check_frames, frames) if frames else None
+                    in_flight.append((samples, future))
+
+            if not in_flight:
+                return
+            samples, future = in_flight.popleft()
+            try:
+                results = iter(future.result() if future else [])
+            except Exception as e:
+                results = iter([(None, e)] * len(samples))
+            for sample_frame, frame, moving in samples:
+                b64_img, verdict = next(results) if moving else (None, None)
+                yield sample_frame, frame, b64_img, verdict
+
+    depth = 2 if pipeline else 1
+    executor = ThreadPoolExecutor(max_workers=depth)
+
+    try:
+        for sample_frame, frame, b64_img, trigger_res in sample_results():
+            if stop_event is not None and stop_event.is_set():
+                log_callback("⏹️  Surveillance stopped.")
+                break
+            minutes, seconds = divmod(int(sample_frame * inv_fps), 60)
+            timestamp = f"{minutes:02d}:{seconds:02d}"
+            if trigger_res is None:
+                log_callback(f"💤 [{timestamp}] No motion - skipped")
+                continue
+            if is_stream:
+                log_callback(f"⏰ [{timestamp}] Analyzing frame...")
+            else:
+                progress = int(sample_frame * inv_total)
+                log_callback(f"⏰ [{timestamp}] Progress: {progress}% - Analyzing frame...")
             
-            if "YES" in trigger_res:
-                log_callback(f"\n💥 ⚠️  IMPACT DETECTED AT {timestamp} ⚠️ 💥")
-                log_callback("🚨 Initiating Emergency Protocol...")
-
-                # Capture a second frame for validation (0.5s later)
-                next_frame_pos = min(curr_frame + int(fps * 0.5), total_frames - 1)
-                cap.set(cv2.CAP_PROP_POS_FRAMES, next_frame_pos)
-                ret_next, frame_next = cap.read()
-                b64_img_2 = encode_image(frame_next if ret_next else frame)
+            try:
+                if isinstance(trigger_res, Exception):
+                    raise trigger_res
                 
-                inputs = {
-                    "frame_b64": b64_img,
-                    "frame_b642": b64_img_2, 
-                    "initial_trigger": "Security Event",
-                    "incident_report": "",
-                    "critique_score": "",
-                    "final_decision": "",
-                    "timestamp": timestamp,
-                    "log_callback": log_callback 
-                }
-                
-                sentinel_app.invoke(inputs)
-                
-                log_callback("\n✅ Emergency protocol completed. Stopping surveillance.")
-                break 
+                if "YES" in trigger_res:
+                    log_callback(f"\n💥 ⚠️  IMPACT DETECTED AT {timestamp} ⚠️ 💥")
+                    log_callback("🚨 Initiating Emergency Protocol...")
 
-            else: 
-                log_callback(f"✓ Status: All clear at {timestamp}")
-                
-        except Exception as e:
-            log_callback(f"⚠️  [Skip {timestamp}] API Error: {e}")
+                    # Capture a second frame for validation (0.5s later). If the
+                    # pipeline already read past it, seek back once; live
+                    # streams can't seek, so they just take the next frame.
+                    next_frame_pos = sample_frame + int(fps * 0.5)
+                    if video.position > next_frame_pos and not is_stream:
+                        frame_next = video.seek(min(next_frame_pos, total_frames - 1))
+                    else:
+                        frame_next = video.read(next_frame_pos)
+                    b64_img_2 = encode_image(frame_next if frame_next is not None else frame)
+                    
+                    inputs = AgentState(
+                        frame_b64=b64_img,
+                        frame_b642=b64_img_2,
+                        initial_trigger="Security Event",
+                        incident_report={},
+                        critique_score="",
+                        final_decision="",
+                        timestamp=timestamp,
+                    )
+                    thread_id = timestamp
+                    
+                    # A failed attempt resumes from its checkpoint on the next
+                    # one; the last attempt never gives up on the report
+                    try:
+                        for attempt in range(1, INCIDENT_ATTEMPTS + 1):
+                            final_attempt = attempt == INCIDENT_ATTEMPTS
+                            try:
+                                asyncio.run(run_sentinel(sentinel_app, inputs, thread_id, log_callback, final_attempt))
+                                break
+                            except Exception as e:
+                                if final_attempt:
+                                    raise
+                                log_callback(f"[ERROR] Emergency protocol failed: {e}. Retrying...")
+                    finally:
+                        memory.delete_thread(thread_id)
+                    
+                    log_callback("\n✅ Emergency protocol completed. Stopping surveillance.")
+                    break 
 
-        curr_frame += step_frames
-        
-        # Exit if we've processed the entire video
-        if curr_frame >= total_frames:
-            break
+                else: 
+                    log_callback(f"✓ Status: All clear at {timestamp}")
+                    
+            except Exception as e:
+                log_callback(f"⚠️  [Skip {timestamp}] API Error: {e}")
+    finally:
+        # Don't wait on prefetched samples once surveillance has stopped
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    cap.release()
+    video.close()
     log_callback("\n━"*60)
     log_callback("🏁 Surveillance session ended.")
     log_callback("━"*60)
@@ -1,13 +1,57 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
-import json
+import concurrent.futures
+import functools
+import threading
+import orjson
 import os
 
 # Import your crash detector
-from crashDetector import main_watcher
-
-app = FastAPI()
+from crashDetector import main_watcher, is_stream_source
+
+# Max log lines buffered per connection before the oldest are dropped
+LOG_QUEUE_SIZE = 1024
+
+def split_cores():
+    """Even cores for video work, odd cores for the event loop (Linux only)."""
+    if not hasattr(os, "sched_getaffinity"):
+        return None, None
+    cores = os.sched_getaffinity(0)
+    video_cores = {core for core in cores if core % 2 == 0}
+    loop_cores = cores - video_cores
+    if not video_cores or not loop_cores:
+        return None, None
+    return video_cores, loop_cores
+
+# Computed before the event loop is pinned, since new threads inherit its mask
+VIDEO_CORES, LOOP_CORES = split_cores()
+
+def pin_video_worker():
+    """Pin a video worker to the video cores."""
+    if VIDEO_CORES:
+        os.sched_setaffinity(0, VIDEO_CORES)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs on the event loop thread; keep it off the video cores
+    if LOOP_CORES:
+        os.sched_setaffinity(0, LOOP_CORES)
+    yield
+
+app = FastAPI(lifespan=lifespan)
+
+# Dedicated pool for decode + encode work so concurrent clients don't
+# oversubscribe cores through the default executor. Sessions beyond the
+# pool size are refused rather than left queued behind endless streams.
+MAX_VIDEO_SESSIONS = max(2, (os.cpu_count() or 2) // 2)
+VIDEO_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=MAX_VIDEO_SESSIONS,
+    thread_name_prefix="video",
+    initializer=pin_video_worker,
+)
+active_sessions = 0
 
 # CORS configuration - allows Next.js frontend to connect
 app.add_middleware(
@@ -18,37 +62,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def send_log(websocket: WebSocket, msg: str):
+    """Send a log line as an orjson-encoded binary frame."""
+    await websocket.send_bytes(orjson.dumps({"log": msg}))
+
 @app.websocket("/ws/process")
 async def process_video(websocket: WebSocket):
     """
     WebSocket endpoint that processes videos and streams logs back to the client.
     """
+    global active_sessions
+    session_started = False
     await websocket.accept()
     
     try:
         # 1. Receive the video path from the React frontend
         data = await websocket.receive_text()
-        payload = json.loads(data)
+        payload = orjson.loads(data)
         video_path = payload.get("video_path")
 
         if not video_path:
-            await websocket.send_json({"log": "❌ Error: No video path provided."})
+            await send_log(websocket, "❌ Error: No video path provided.")
             return
 
-        # Resolve relative paths if needed
-        if not os.path.isabs(video_path):
-            # Assuming videos are in a 'public' or 'videos' folder
-            video_path = os.path.join(os.getcwd(), video_path.lstrip('./'))
+        # Resolve relative paths if needed (stream URLs are passed through)
+        if not is_stream_source(video_path):
+            if not os.path.isabs(video_path):
+                # Assuming videos are in a 'public' or 'videos' folder
+                video_path = os.path.join(os.getcwd(), video_path.lstrip('./'))
+
+            if not os.path.exists(video_path):
+                await send_log(websocket, f"❌ Video file not found: {video_path}")
+                return
 
-        if not os.path.exists(video_path):
-            await websocket.send_json({"log": f"❌ Video file not found: {video_path}"})
+        if active_sessions >= MAX_VIDEO_SESSIONS:
+            await send_log(websocket, "❌ Server busy: too many active sessions. Try again later.")
             return
+        active_sessions += 1
+        session_started = True
 
-        await websocket.send_json({"log": f"📹 Starting analysis on: {os.path.basename(video_path)}"})
+        await send_log(websocket, f"📹 Starting analysis on: {os.path.basename(video_path)}")
 
         # 2. Create an async queue for thread-safe logging
         loop = asyncio.get_running_loop()
-        log_queue = asyncio.Queue()
+        log_queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+
+        def enqueue_log(msg):
+            """Queue a log line, dropping the oldest one if the client has stalled."""
+            try:
+                log_queue.put_nowait(msg)
+            except asyncio.QueueFull:
+                log_queue.get_nowait()
+                log_queue.put_nowait(msg)
 
         def sync_log_callback(msg: str):
             """
@@ -57,38 +122,64 @@ async def process_video(websocket: WebSocket):
             into the async queue for WebSocket transmission.
             """
             try:
-                loop.call_soon_threadsafe(log_queue.put_nowait, msg)
+                loop.call_soon_threadsafe(enqueue_log, msg)
             except Exception as e:
                 print(f"Error in log callback: {e}")
 
-        # 3. Background task to send queued logs to WebSocket
+        # 3. Background task to send queued logs to WebSocket, flushing
+        # everything queued so far as a single frame
         async def send_logs():
             while True:
-                msg = await log_queue.get()
-                if msg is None:  # None signals completion
-                    break
+                msgs = [await log_queue.get()]
                 try:
-                    await websocket.send_json({"log": msg})
+                    while True:
+                        msgs.append(log_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    pass
+                done = None in msgs  # None signals completion
+                msgs = [msg for msg in msgs if msg is not None]
+                try:
+                    if msgs:
+                        await websocket.send_bytes(orjson.dumps({"logs": msgs}))
                 except Exception as e:
                     print(f"Error sending log: {e}")
                     break
+                if done:
+                    break
 
         sender_task = asyncio.create_task(send_logs())
 
+        # Stop the watcher as soon as the client goes away, so endless
+        # streams don't hold a worker forever
+        stop_event = threading.Event()
+
+        async def watch_disconnect():
+            try:
+                while (await websocket.receive())["type"] != "websocket.disconnect":
+                    pass
+            finally:
+                stop_event.set()
+
+        disconnect_task = asyncio.create_task(watch_disconnect())
+
         # 4. Run the video processing in a thread pool executor
         # This prevents blocking the async event loop
-        await loop.run_in_executor(
-            None, 
-            main_watcher, 
-            video_path, 
-            sync_log_callback
-        )
+        try:
+            await loop.run_in_executor(
+                VIDEO_EXECUTOR, 
+                functools.partial(main_watcher, stop_event=stop_event), 
+                video_path, 
+                sync_log_callback
+            )
+        finally:
+            stop_event.set()
+            disconnect_task.cancel()
 
         # 5. Signal completion and wait for sender to finish
-        await log_queue.put(None)
+        enqueue_log(None)
         await sender_task
         
-        await websocket.send_json({"log": "✅ Video analysis complete."})
+        await send_log(websocket, "✅ Video analysis complete.")
 
     except WebSocketDisconnect:
         print("⚠️ Client disconnected during processing.")
@@ -96,10 +187,12 @@ async def process_video(websocket: WebSocket):
         error_msg = f"❌ Server Error: {str(e)}"
         print(error_msg)
         try:
-            await websocket.send_json({"log": error_msg})
+            await send_log(websocket, error_msg)
         except:
             pass
     finally:
+        if session_started:
+            active_sessions -= 1
         try:
             await websocket.close()
         except:
@@ -111,7 +204,19 @@ async def health_check():
     return {"status": "online", "service": "Crash Detection API"}
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
     print("🚀 Starting Crash Detection Server...")
     print("📡 WebSocket endpoint: ws://localhost:8000/ws/process")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Use uvloop + httptools when installed (`pip install uvloop httptools`).
+    # The reloader burns a core watching the filesystem, so it is opt-in for
+    # development: SENTINEL_RELOAD=1 python main.py
+    has_module = lambda name: importlib.util.find_spec(name) is not None
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop" if has_module("uvloop") else "auto",
+        http="httptools" if has_module("httptools") else "auto",
+        reload=os.getenv("SENTINEL_RELOAD") == "1",
+    )
\ No newline at end of file
@@ -29,15 +29,20 @@ export default function App() {
 
     setLogs([])
     const ws = new WebSocket('ws://localhost:8000/ws/process')
+    ws.binaryType = 'arraybuffer'
     wsRef.current = ws
+    const decoder = new TextDecoder()
 
     ws.onopen = () => {
       ws.send(JSON.stringify({ video_path: selectedVideo.path }))
     }
 
     ws.onmessage = (event) => {
-      const data = JSON.parse(event.data)
-      if (data.log) {
+      const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data)
+      const data = JSON.parse(text)
+      if (data.logs) {
+        setLogs(prev => [...prev, ...data.logs])
+      } else if (data.log) {
         setLogs(prev => [...prev, data.log])
       }
     }